@@ -1,89 +1,156 @@
+import csv
 import json
+import os
 from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto
+from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict
-from xml.etree import ElementTree as ET
+from typing import IO, Any, Dict, Set, Tuple
 from zipfile import ZipFile
 
-import pandas as pd
+from lxml import etree as ET
+
+# Only these elements are reported by the parser, everything else is skipped in C.
+ANALYSED_TAGS = ("note", "attributes", "measure", "part")
 
 
 def main(args: Namespace) -> None:
-    output = {}
-    for folder in [x for x in args.root_path.glob("*") if x.is_dir()]:
-        mxml_path = [x for x in folder.glob("*.mxl")][0]
-        with ZipFile(mxml_path) as f_zip:
-            file_list = f_zip.namelist()
-            with f_zip.open(file_list[-1], "r") as xml_file:
-                root = ET.parse(xml_file)
-        output[mxml_path.stem] = {}
-        for part in root.findall("part"):
-            ident = part.get("id")
-            results = analyse_part(part)
-            output[mxml_path.stem][ident] = results
+    with os.scandir(args.root_path) as entries:
+        folders = [Path(x.path) for x in entries if x.is_dir()]
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        output = dict(executor.map(analyse_folder, folders))
 
     with open(args.root_path / "part_difficulty.json", "w") as f_json:
         json.dump(output, f_json)
 
-    dataframe = pd.DataFrame.from_dict(output)
-    dataframe.to_csv(args.root_path / "part_difficulty.csv")
+    write_csv(output, args.root_path / "part_difficulty.csv")
+
+
+def write_csv(output: Dict[str, Dict[str, Any]], path: Path) -> None:
+    """Write a table with one column per score and one row per part id."""
+    part_ids = list(dict.fromkeys(part for parts in output.values() for part in parts))
+    with open(path, "w", newline="") as f_csv:
+        writer = csv.writer(f_csv)
+        writer.writerow(["", *output.keys()])
+        for part in part_ids:
+            writer.writerow([part, *(parts.get(part, "") for parts in output.values())])
+
 
+def analyse_folder(folder: Path) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """Analyse the MusicXML score within a folder.
+
+    Returns the stem of the score file along with the properties of each part.
+    """
+    with os.scandir(folder) as entries:
+        mxml_path = [Path(x.path) for x in entries if x.name.endswith(".mxl")][0]
+    with ZipFile(mxml_path) as f_zip:
+        file_list = f_zip.namelist()
+        xml_bytes = f_zip.read(file_list[-1])
+    return mxml_path.stem, analyse_score(BytesIO(xml_bytes))
+
+
+def analyse_score(xml_file: IO[bytes]) -> Dict[str, Dict[str, Any]]:
+    """Stream through a MusicXML file and compute the properties of each part.
+
+    Measures and parts are cleared as soon as they have been analysed, so only
+    the measure being read is ever held in memory.
+    """
+    output = {}
+    part_properties = _new_part()
+    measure_properties = _new_measure()
+    voices: Set[str] = set()
+
+    for _, elm in ET.iterparse(
+        xml_file, events=("end",), tag=ANALYSED_TAGS, huge_tree=True
+    ):
+        tag = elm.tag
+        if tag == "note":
+            analyse_note(elm, measure_properties, voices)
+        # elif tag == "backup":
+        #     measure_properties["polyphony"] = True
+        elif tag == "attributes":
+            analyse_attributes(elm, measure_properties)
+        elif tag == "measure":
+            if len(voices) > 1:
+                measure_properties["polyphony"] = True
+            update_part(part_properties, measure_properties)
+            measure_properties = _new_measure()
+            voices = set()
+            elm.clear()
+        elif tag == "part":
+            output[elm.get("id")] = part_properties
+            part_properties = _new_part()
+            elm.clear()
 
-def analyse_part(part: ET.Element) -> Dict[str, Any]:
-    output = {
+    return output
+
+
+def _new_part() -> Dict[str, Any]:
+    return {
         "max_beaming": 0,
         "max_staves": 1,
         "polyphony_type": "monophonic",
         "staff_type": "single",
     }
-    for measure in part:
-        measure_properties = analyse_measure(measure)
-        if measure_properties["homophony"]:
-            output["polyphony_type"] = "homophonic"
-        if measure_properties["polyphony"]:
-            output["polyphony_type"] = "polyphonic"
 
-        if measure_properties["nstaves"] > 1:
-            output["staff_type"] = "multiple"
 
-        output["max_beaming"] = max(
-            output["max_beaming"], measure_properties["max_beaming"]
-        )
-        output["max_staves"] = max(output["max_staves"], measure_properties["nstaves"])
-
-    return output
-
-
-def analyse_measure(measure: ET.Element) -> Dict[str, Any]:
-    output = {
+def _new_measure() -> Dict[str, Any]:
+    return {
         "homophony": False,
         "polyphony": False,
         "nstaves": 0,
         "max_beaming": 0,
     }
-    voices = set()
-    for elm in measure:
-        if elm.tag == "note":
-            print_object = elm.get("print-object")
-            if print_object is not None and print_object == "no":
-                continue
-            output["max_beaming"] = max(output["max_beaming"], len(elm.findall("beam")))
-            if elm.find("chord") is not None:
-                output["homophony"] = True
-            voice = elm.find("voice")
-            if voice is not None:
-                voices.add(voice.text)
-        # elif elm.tag == "backup":
-        #     output["polyphony"] = True
-        elif elm.tag == "attributes":
-            nstaves = elm.find("staves")
-            if nstaves is not None:
-                output["nstaves"] = max(output["nstaves"], int(nstaves.text))
-    if len(voices) > 1:
-        output["polyphony"] = True
 
-    return output
+
+def update_part(output: Dict[str, Any], measure_properties: Dict[str, Any]) -> None:
+    """Fold the properties of a finished measure into those of its part."""
+    if measure_properties["homophony"]:
+        output["polyphony_type"] = "homophonic"
+    if measure_properties["polyphony"]:
+        output["polyphony_type"] = "polyphonic"
+
+    if measure_properties["nstaves"] > 1:
+        output["staff_type"] = "multiple"
+
+    output["max_beaming"] = max(
+        output["max_beaming"], measure_properties["max_beaming"]
+    )
+    output["max_staves"] = max(output["max_staves"], measure_properties["nstaves"])
+
+
+def analyse_note(elm: ET._Element, output: Dict[str, Any], voices: Set[str]) -> None:
+    """Update the properties of the current measure with a note element."""
+    if elm.attrib.get("print-object") == "no":
+        return
+
+    beams = 0
+    has_chord = False
+    has_voice = False
+    voice_text = None
+    for child in elm:
+        tag = child.tag
+        if tag == "beam":
+            beams += 1
+        elif tag == "chord":
+            has_chord = True
+        elif tag == "voice" and not has_voice:
+            has_voice = True
+            voice_text = child.text
+
+    output["max_beaming"] = max(output["max_beaming"], beams)
+    if has_chord:
+        output["homophony"] = True
+    if has_voice:
+        voices.add(voice_text)
+
+
+def analyse_attributes(elm: ET._Element, output: Dict[str, Any]) -> None:
+    """Update the properties of the current measure with an attributes element."""
+    nstaves = elm.find("staves")
+    if nstaves is not None:
+        output["nstaves"] = max(output["nstaves"], int(nstaves.text))
 
 
 def setup() -> Namespace:
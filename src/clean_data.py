@@ -7,14 +7,18 @@ This script performs data cleaning the following way:
 
 It also creates different versions of the data with different delta granularity
 """
-import json
+import os
+import pickle
 import re
 from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
 from fractions import Fraction
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, NamedTuple, Set, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
 from xml.etree import ElementTree as ET
 
+import orjson
 from comref_converter import AST, TranslatorXML, VisitorToXML
 from comref_converter.visitor_get_tokens import VisitorGetTokens
 
@@ -31,63 +35,65 @@ class Identifier(NamedTuple):
 def _get_img_ids(path: Path) -> Set[Identifier]:
     """Search engraved measure ids within the picture files."""
     output = set()
-    for img_path in path.glob("*.png"):
-        mch = RE_MEASURE.match(img_path.name)
-        if mch is not None:
-            output.add(Identifier(part=mch.group(1), measure=mch.group(2)))
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".png"):
+                continue
+            mch = RE_MEASURE.match(entry.name)
+            if mch is not None:
+                output.add(Identifier(part=mch.group(1), measure=mch.group(2)))
 
     return output
 
 
-def remove_non_engraved(
-    data: Dict[Identifier, AST.Measure], other: Set[Identifier]
-) -> Dict[Identifier, AST.Measure]:
-    """Remove any measures that have no engraved image associated with them."""
-    curr_keys = set(data.keys())
-    keys = other.intersection(curr_keys)
-    return {k: data[k] for k in keys}
+def clean_measures(
+    data: Dict[Identifier, AST.Measure],
+    engraved: Set[Identifier],
+    drange: Tuple[int, int],
+    visitor: VisitorGetTokens,
+) -> Tuple[Dict[Identifier, AST.Measure], List[Identifier], List[Identifier]]:
+    """Filter the measures of a score in a single pass.
 
-
-def remove_offside(
-    data: Dict[Identifier, AST.Measure], drange: Tuple[int, int]
-) -> Tuple[Dict[Identifier, AST.Measure], List[Identifier]]:
-    """Remove any measures that contain heavy outliers."""
+    Measures without an engraved image are dropped silently. Measures with token
+    positions outside drange (both included) are reported as offside, and the
+    remaining ones with negative time values as negative delta. Returns the kept
+    measures along with the offside and negative delta identifiers.
+    """
     output = {}
-    outofrange = []
+    offside = []
+    negdelta = []
+    low, high = drange
     for k, v in data.items():
-        visitor = VisitorGetTokens()
-        tokens = visitor.visit_ast(v)
-
-        if all(map(lambda token: _in_range(drange, token), tokens)):
-            output[k] = v
+        if k not in engraved:
+            continue
+        if not _all_in_range(visitor.visit_ast(v), low, high):
+            offside.append(k)
+        elif _has_negative_delta(v):
+            negdelta.append(k)
         else:
-            outofrange.append(k)
-    return output, outofrange
+            output[k] = v
+    return output, offside, negdelta
 
 
-def remove_invalid_time(
-    data: Dict[Identifier, AST.Measure]
-) -> Tuple[Dict[Identifier, AST.Measure], List[Identifier]]:
-    """Remove measures with negative time values."""
-    output = {}
-    outofrange = []
-    for k, v in data.items():
-        for element in v.elements:
-            time = element.delta
-            if time is not None and time < 0:
-                outofrange.append(k)
-                break
-        else:
-            output[k] = v
-    return output, outofrange
+def _has_negative_delta(measure: AST.Measure) -> bool:
+    """Check whether any element of the measure has a negative time value."""
+    for element in measure.elements:
+        time = element.delta
+        if time is not None and time < 0:
+            return True
+    return False
 
 
-def _in_range(drange: Tuple[int, int], token: AST.Token) -> bool:
-    return (
-        (drange[0] <= token.position.position <= drange[1])
-        if token.position.position is not None
-        else True
-    )
+def _all_in_range(tokens: Iterable[AST.Token], low: int, high: int) -> bool:
+    """Check whether all token positions lie within [low, high] (both included).
+
+    Tokens without a position are ignored. Stops at the first token out of range.
+    """
+    for token in tokens:
+        position = token.position.position
+        if position is not None and not low <= position <= high:
+            return False
+    return True
 
 
 def preprocess_unzipped_mtn(mtn_file: Path) -> ET.Element:
@@ -96,58 +102,95 @@ def preprocess_unzipped_mtn(mtn_file: Path) -> ET.Element:
     return root.getroot()
 
 
-def main(args: Namespace) -> None:
-    """Clean the data very clean thank you."""
-    removed_overall = {}
-    for folder in args.root.glob("*"):
-        if not folder.is_dir():
-            continue
-        print(f"Processing {str(folder)}...")
-        tree = preprocess_unzipped_mtn(folder / (folder.name + ".mtn"))
-        xml_translator = TranslatorXML()
+def load_score(mtn_file: Path) -> AST.Score:
+    """Load and translate an unzipped xml file.
 
-        score = xml_translator.translate(tree, "", set())
+    The xml tree is only referenced within this function, so it is released as
+    soon as the translation is done.
+    """
+    xml_translator = TranslatorXML()
+    return xml_translator.translate(preprocess_unzipped_mtn(mtn_file), "", set())
 
-        score_data = {
-            Identifier(part=x.part_id, measure=x.measure_id): x for x in score.measures
-        }
 
-        if args.tolerance is not None:
-            tolerance = (args.tolerance[0], args.tolerance[1])
-        else:
-            tolerance = (-15, 24)
-        data = remove_non_engraved(score_data, _get_img_ids(folder / "measures"))
-        data, offside = remove_offside(data, tolerance)
-        data, negdelta = remove_invalid_time(data)
-
-        removed_overall[folder.name] = {"offside": offside, "negative_delta": negdelta}
-
-        with open(folder / "removed_on_cleanup.json", "w", encoding="utf-8") as f_out:
-            json.dump(removed_overall[folder.name], f_out, indent=4)
-
-        output_data = AST.Score(
-            [measure for _, measure in data.items()],
-            score_id=score.score_id,
-        )
-        visitor_xml = VisitorToXML()
-        output_xml = visitor_xml.visit_ast(output_data)
-        root_element = ET.ElementTree(output_xml)
-        ET.indent(root_element, space="    ", level=0)
-        root_element.write(folder / (folder.name + "_clean.mtn"))
-
-    removed_output = {
-        "offside": [
-            f"{fn}_{x}" for fn, v in removed_overall.items() for x in v["offside"]
-        ],
-        "negative_delta": [
-            f"{fn}_{x}"
-            for fn, v in removed_overall.items()
-            for x in v["negative_delta"]
-        ],
+def write_mtn(score: AST.Score, mtn_file: Path) -> None:
+    """Serialise a score into an indented xml file."""
+    visitor_xml = VisitorToXML()
+    root_element = ET.ElementTree(visitor_xml.visit_ast(score))
+    ET.indent(root_element, space="    ", level=0)
+    root_element.write(mtn_file)
+
+
+def process_folder(
+    folder: Path, tolerance: Tuple[int, int], write_log: bool = True
+) -> Tuple[str, Dict[str, List[Identifier]]]:
+    """Clean a single score folder and write its cleaned files.
+
+    Returns the folder name along with the identifiers of the removed measures.
+    The folder's own removed_on_cleanup.json is only written if write_log is set,
+    otherwise any existing one is removed.
+    """
+    print(f"Processing {str(folder)}...")
+    score = load_score(folder / (folder.name + ".mtn"))
+    score_id = score.score_id
+
+    score_data = {
+        Identifier(part=x.part_id, measure=x.measure_id): x for x in score.measures
     }
+    del score
+
+    data, offside, negdelta = clean_measures(
+        score_data, _get_img_ids(folder / "measures"), tolerance, VisitorGetTokens()
+    )
+
+    removed = {"offside": offside, "negative_delta": negdelta}
+
+    log_path = folder / "removed_on_cleanup.json"
+    if write_log:
+        with open(log_path, "wb") as f_out:
+            f_out.write(
+                orjson.dumps(removed, default=list, option=orjson.OPT_INDENT_2)
+            )
+    else:
+        # A log from an earlier run would no longer match the new cleaned files.
+        log_path.unlink(missing_ok=True)
+
+    output_data = AST.Score(
+        [measure for _, measure in data.items()],
+        score_id=score_id,
+    )
+    del score_data, data
+    write_mtn(output_data, folder / (folder.name + "_clean.mtn"))
 
-    with open(args.root / "removed_on_cleanup.json", "w", encoding="utf-8") as f_out:
-        json.dump(removed_output, f_out, indent=4)
+    with open(folder / (folder.name + "_clean.ast.pkl"), "wb") as f_pkl:
+        pickle.dump(output_data, f_pkl, protocol=5)
+
+    return folder.name, removed
+
+
+def main(args: Namespace) -> None:
+    """Clean the data very clean thank you."""
+    if args.tolerance is not None:
+        tolerance = (args.tolerance[0], args.tolerance[1])
+    else:
+        tolerance = (-15, 24)
+
+    with os.scandir(args.root) as entries:
+        folders = [Path(x.path) for x in entries if x.is_dir()]
+    offside_all: List[str] = []
+    negdelta_all: List[str] = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for folder_name, removed in executor.map(
+            process_folder,
+            folders,
+            repeat(tolerance),
+            repeat(not args.no_per_folder_log),
+        ):
+            offside_all.extend(f"{folder_name}_{x}" for x in removed["offside"])
+            negdelta_all.extend(f"{folder_name}_{x}" for x in removed["negative_delta"])
+
+    removed_output = {"offside": offside_all, "negative_delta": negdelta_all}
+    with open(args.root / "removed_on_cleanup.json", "wb") as f_out:
+        f_out.write(orjson.dumps(removed_output))
 
 
 def setup() -> Namespace:
@@ -165,6 +208,12 @@ def setup() -> Namespace:
         type=int,
         help="Low and high tolerance for in-staff position (both included)",
     )
+    parser.add_argument(
+        "--no-per-folder-log",
+        action="store_true",
+        help="Do not write a removed_on_cleanup.json file within each folder "
+        "(existing ones are removed)",
+    )
 
     args = parser.parse_args()
 
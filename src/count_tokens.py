@@ -1,28 +1,70 @@
+import hashlib
 import json
+import os
+import pickle
+import sys
 from argparse import ArgumentParser, Namespace
 from collections import Counter
 from pathlib import Path
 from xml.etree import ElementTree as ET
 
-from comref_converter import TranslatorXML
+from comref_converter import AST, TranslatorXML
 from comref_converter.visitor_get_tokens import VisitorGetTokens
 
 
 def main(args: Namespace) -> None:
     counter = Counter()
-    for folder in args.root.glob("*"):
-        tl = TranslatorXML()
-        vst = VisitorGetTokens()
-        if not folder.is_dir():
-            continue
-        root = ET.parse(folder / (folder.name + "_clean.mtn")).getroot()
-        converted = tl.translate(root, "", set())
-
-        counter.update(map(str, vst.visit_ast(converted)))
+    tl = TranslatorXML()
+    vst = VisitorGetTokens()
+    with os.scandir(args.root) as entries:
+        folders = [Path(x.path) for x in entries if x.is_dir()]
+    for folder in folders:
+        counter.update(count_folder_tokens(folder, tl, vst))
     with open(args.root / "token_counts.json", "w") as f_out:
         json.dump(counter, f_out)
 
 
+def count_folder_tokens(
+    folder: Path, translator: TranslatorXML, visitor: VisitorGetTokens
+) -> Counter:
+    """Count the tokens of the cleaned score of a folder.
+
+    Counts are cached within the folder under a hash of the cleaned MTN file, so
+    unchanged folders are not parsed again on later runs.
+    """
+    mtn_path = folder / (folder.name + "_clean.mtn")
+    digest = hashlib.blake2b(mtn_path.read_bytes(), digest_size=16).hexdigest()
+    cache_path = folder / f".tokens.{digest}.json"
+    if cache_path.exists():
+        with open(cache_path) as f_cache:
+            return Counter(json.load(f_cache))
+
+    converted = load_clean_score(folder, translator)
+    counts = Counter(sys.intern(str(token)) for token in visitor.visit_ast(converted))
+
+    for stale_path in folder.glob(".tokens.*.json"):
+        stale_path.unlink()
+    with open(cache_path, "w") as f_cache:
+        json.dump(counts, f_cache)
+    return counts
+
+
+def load_clean_score(folder: Path, translator: TranslatorXML) -> AST.Score:
+    """Load the cleaned score of a folder.
+
+    The AST pickled by clean_data is used whenever it is at least as recent as
+    the cleaned MTN file, otherwise the MTN file is parsed and translated.
+    """
+    mtn_path = folder / (folder.name + "_clean.mtn")
+    pkl_path = folder / (folder.name + "_clean.ast.pkl")
+    if pkl_path.exists() and pkl_path.stat().st_mtime >= mtn_path.stat().st_mtime:
+        with open(pkl_path, "rb") as f_pkl:
+            return pickle.load(f_pkl)
+
+    root = ET.parse(mtn_path).getroot()
+    return translator.translate(root, "", set())
+
+
 def setup() -> Namespace:
     """Parse args and set up stuff."""
     parser = ArgumentParser()
@@ -19,31 +19,49 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+import os
 import random
 import re
-import xml.etree.ElementTree as ET
 from argparse import ArgumentParser, Namespace
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from itertools import repeat
+from operator import add
 from pathlib import Path
 from shutil import copy, rmtree
 from subprocess import run
-from typing import Any, Callable, Dict, List, NamedTuple, Tuple
-from xml.etree.ElementTree import Element
+from typing import Any, Callable, DefaultDict, Dict, List, NamedTuple, Tuple
 from zipfile import ZipFile
 
+import cairosvg
 import cv2
+import numpy as np
+from lxml import etree as ET
 from tqdm.auto import tqdm
 
-RE_FILES = re.compile(r"Output written to .+\/(.+\_[0-9]+\.svg)\.")
 RE_NAME = re.compile(r"(.+)\_[0-9]+")
-RE_LINE_COMMAND = re.compile(r"M([0-9]+)\s+([0-9]+)\s+L([0-9]+)\s+([0-9]+)")
+RE_LINE_COMMAND = re.compile(
+    r"^M([0-9]+)\s+([0-9]+)\s+L([0-9]+)\s+([0-9]+)", re.MULTILINE
+)
 
 NAMESPACES = {
     "svg": "http://www.w3.org/2000/svg",
     "mei": "http://www.w3.org/1999/xlink",
 }
 
+XML_PARSER = ET.XMLParser(huge_tree=True, collect_ids=False)
+
+# Threads encoding measure crops within each page worker.
+WRITER_THREADS = 4
+
+# Plain (x, y, w, h) tuple used instead of BoundingBox within the page hot paths.
+RawBox = Tuple[int, int, int, int]
+
 
 class BoundingBox(NamedTuple):
     """Represents a bounding box in XYWH format."""
@@ -87,15 +105,32 @@ class VerovioNotFoundError(Exception):
     ...
 
 
-class InkscapeNotFoundError(Exception):
-    """An error related to verovio not being installed."""
+@lru_cache(maxsize=1)
+def probe_verovio() -> None:
+    """Check whether verovio is installed or not.
 
-    ...
+    The check is only run once per process, successive calls are free.
+
+    Raises
+    ------
+    VerovioNotFoundError
+        If Verovio is not found when called. It should be installed on the system
+        and added to PATH.
+    """
+    try:
+        run(["verovio", "-h base"], capture_output=True, check=False)
+    except FileNotFoundError as exc:
+        raise VerovioNotFoundError("Verovio could not be found in PATH") from exc
 
 
 class MeasureGenerator:
     """Encapsulates measure generation operations."""
 
+    _XP_MEASURES = ET.XPath(".//svg:g[@class='measure']", namespaces=NAMESPACES)
+    _XP_STAVES = ET.XPath(".//svg:g[@class='staff']", namespaces=NAMESPACES)
+    _XP_PATHS = ET.XPath("./svg:path", namespaces=NAMESPACES)
+    _XP_SCALE = ET.XPath('.//svg:svg[@class="definition-scale"]', namespaces=NAMESPACES)
+
     def __init__(
         self,
         ipath: Path,
@@ -115,8 +150,7 @@ class MeasureGenerator:
             the original staff height. This enlargement is done on both sides of the
             staff.
         """
-        self._probe_verovio()
-        self._probe_inkscape()
+        probe_verovio()
 
         self._ipath = ipath
         self._opath = opath
@@ -124,17 +158,16 @@ class MeasureGenerator:
         self._hfactor = hfactor
 
     @staticmethod
-    def _open_zip(path: Path) -> Any:
+    def _open_zip(path: Path) -> bytes:
         with ZipFile(path) as f_zip:
             file_list = f_zip.namelist()
             logging.debug("Loading %s from within the MXML file", file_list[-1])
-            xml_file = f_zip.open(file_list[-1], "r")
-        return ET.parse(xml_file)
+            return f_zip.read(file_list[-1])
 
     def generate(self) -> None:
         """Perform the main logic of the converter."""
         mxml = self._open_zip(self._ipath)
-        print(f"Processing {str(self._ipath)}...")
+        logging.info("Processing %s...", str(self._ipath))
         output_path = self._opath / self._ipath.stem
         output_path.mkdir(parents=True, exist_ok=True)
 
@@ -148,14 +181,13 @@ class MeasureGenerator:
         written = []
         pages: List[str] = []
 
-        print("Copying original mxml into output dir...")
+        logging.info("Copying original mxml into output dir...")
         copy(self._ipath, output_path / self._ipath.name)
 
         try:
-            print("Engraving score using verovio...")
+            logging.info("Engraving score using verovio...")
             pages = self._run_verovio(self._ipath, page_path)
         except VerovioError:
-            print(f"Could not generate a verovio score from {str(self._ipath)}")
             logging.info(
                 "Verovio failed to produce a meaningful output for File "
                 "%s. Skipping...",
@@ -163,27 +195,35 @@ class MeasureGenerator:
             )
             rmtree(output_path)
         except ValueError as exc:
-            print(f"Unknown error: {repr(exc)}")
+            logging.info("Unknown error: %s", repr(exc))
             rmtree(output_path)
 
-        print(f"Done! Produced {len(pages)} pages of music")
         logging.info("Verovio produced %i pages.", len(pages))
         nstaves = self._get_staves(mxml)
 
-        print("Processing page measures...")
+        logging.info("Processing page measures...")
         try:
-            for page in tqdm(pages, desc="Progress: "):
-                curr_fb, current_w = self._process_page_svg(
-                    page_path / page, nstaves, measure_path, self._ipath.stem
+            # Leave a couple of cores free so that file I/O does not thrash.
+            workers = max(1, (os.cpu_count() or 1) - 2)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    self._process_page_svg,
+                    [page_path / page for page in pages],
+                    repeat(nstaves),
+                    repeat(measure_path),
+                    repeat(self._ipath.stem),
                 )
-                feedback += curr_fb
-                written += current_w
+                for curr_fb, current_w in tqdm(
+                    results, total=len(pages), desc="Progress: "
+                ):
+                    feedback += curr_fb
+                    written += current_w
         except ValueError as exc:
             logging.info("Problem while processing page %s. Skipping...", repr(exc))
             rmtree(output_path)
         with open(output_path / "feedback.json", "w", encoding="utf-8") as f_fb:
             json.dump(feedback, f_fb)
-        print("Done!")
+        logging.info("Done!")
 
     def _process_page_svg(
         self, input_file: Path, staff_info: Dict, output_folder: Path, base_fname: str
@@ -202,7 +242,7 @@ class MeasureGenerator:
 
         index2part = {y: k for k, x in staff_info.items() for y in x["part_indices"]}
 
-        svg_xml = ET.parse(str(input_file)).getroot()
+        svg_xml = ET.parse(str(input_file), XML_PARSER).getroot()
         png_img = self._svg2img(input_file)
 
         img_height, img_width, _ = png_img.shape
@@ -210,8 +250,6 @@ class MeasureGenerator:
         img_size = (img_width, img_height)
         canvas_size = (canvas_width, canvas_height)
 
-        conversor = self._produce_conversor(canvas_size, img_size)
-
         base_staff_coordinates = self._find_staff_coordinates(svg_xml)
         staff_coordinates = self._merge_staves(base_staff_coordinates, index2part)
         staff_coordinates = self._expand_staves(
@@ -219,45 +257,66 @@ class MeasureGenerator:
             canvas_height,
             canvas_width,
         )
-        staff_coordinates = {k: conversor(v) for k, v in staff_coordinates.items()}
+        corners = self._scale_boxes(
+            np.array(list(staff_coordinates.values()), dtype=np.int64).reshape(-1, 4),
+            canvas_size,
+            img_size,
+        )
+        leftmost_measures = self._find_leftmost(list(staff_coordinates), corners)
 
-        leftmost_measures = self._find_leftmost(staff_coordinates)
+        # Crop corners in (x1, y1, x2, y2) format, clipped to the raster bounds.
+        corners[:, 2:] += corners[:, :2]
+        corners[:, 0::2] = np.clip(corners[:, 0::2], 0, img_width)
+        corners[:, 1::2] = np.clip(corners[:, 1::2], 0, img_height)
 
-        for k, coord in staff_coordinates.items():
+        crop_paths = []
+        crops = []
+        for k, (x1, y1, x2, y2) in zip(staff_coordinates, corners.tolist()):
             part_id, measure_id = k
             # system_staff = staff_info[part_id]["part_indices"].index(staff_number) + 1
-            crop = png_img[coord.y : coord.y + coord.h, coord.x : coord.x + coord.w, :]
+            # Crops are strided views of the page, OpenCV encodes them without copying
+            crop = png_img[y1:y2, x1:x2, :]
             fname = f"{base_fname}_p{part_id}_m{measure_id}.png"
-            cv2.imwrite(str(output_folder / fname), crop)
+            crop_paths.append(output_folder / fname)
+            crops.append(crop)
             written.append(fname)
 
             if k in leftmost_measures:
                 feedback.append(k)
 
+        # OpenCV releases the GIL while encoding, so crops are compressed in parallel
+        # and each thread moves on to its next crop while the OS takes the write.
+        with ThreadPoolExecutor(max_workers=WRITER_THREADS) as writers:
+            list(writers.map(self._write_png, crop_paths, crops))
+
         return feedback, written
 
     def _merge_staves(
         self,
         staff_coordinates: Dict[Tuple[str, int], BoundingBox],
         index2part: Dict[int, str],
-    ) -> Dict[Tuple[str, str], BoundingBox]:
-        output: Dict[Tuple[str, str], BoundingBox] = {}
-
+    ) -> Dict[Tuple[str, str], RawBox]:
+        groups: DefaultDict[Tuple[str, str], List[BoundingBox]] = defaultdict(list)
         for ident, bbox in staff_coordinates.items():
-            measure_part = (index2part[ident[1]], ident[0])
-            if measure_part in output:
-                output[measure_part] = output[measure_part].merge(bbox)
-            else:
-                output[measure_part] = bbox
+            groups[(index2part[ident[1]], ident[0])].append(bbox)
+
+        output: Dict[Tuple[str, str], RawBox] = {}
+        for measure_part, bboxes in groups.items():
+            xs, ys, ws, hs = zip(*bboxes)
+            x1 = min(xs)
+            y1 = min(ys)
+            x2 = max(map(add, xs, ws))
+            y2 = max(map(add, ys, hs))
+            output[measure_part] = (x1, y1, x2 - x1, y2 - y1)
 
         return output
 
     def _expand_staves(
         self,
-        coordinates: Dict[Tuple[str, str], BoundingBox],
+        coordinates: Dict[Tuple[str, str], RawBox],
         page_height: int,
         page_width: int,
-    ) -> Dict[Tuple[str, str], BoundingBox]:
+    ) -> Dict[Tuple[str, str], RawBox]:
         """Expand measures vertically to an arbitrary size.
 
         :param coordinates: A dictionary with measure and staff ids as key and
@@ -268,91 +327,106 @@ class MeasureGenerator:
         :returns: Adjusted bboxes to span the maximum amount of space possible.
         """
         output = {}
-        y1values = sorted(
-            list(set(bbox.y for bbox in coordinates.values())) + [page_height]
-        )
-        y2values = sorted(
-            [0] + list(set(bbox.y + bbox.h for bbox in coordinates.values()))
-        )
-
-        yconv = dict(zip(y1values[:-1], y2values[:-1]))
-        hconv = {
-            oldy: end - start
+        tops = set()
+        bottoms = set()
+        for _, y, _, h in coordinates.values():
+            tops.add(y)
+            bottoms.add(y + h)
+        y1values = sorted([*tops, page_height])
+        y2values = sorted([0, *bottoms])
+
+        # Each original top is mapped onto the new top and height of its band.
+        spans = {
+            oldy: (start, end - start)
             for oldy, start, end in zip(y1values[:-1], y2values[:-1], y1values[1:])
         }
 
-        for key, coord in coordinates.items():
-            output[key] = BoundingBox(
-                x=max(0, coord.x - 720),
-                y=yconv[coord.y],
-                w=min(page_width, coord.w + (2 * 720)),
-                h=hconv[coord.y],
+        for key, (x, y, w, _) in coordinates.items():
+            new_y, new_h = spans[y]
+            output[key] = (
+                max(0, x - 720),
+                new_y,
+                min(page_width, w + (2 * 720)),
+                new_h,
             )
 
         return output
 
     def _find_leftmost(
         self,
-        staff_info: Dict[Tuple[str, str], BoundingBox],
+        keys: List[Tuple[str, str]],
+        boxes: np.ndarray,
     ) -> List[Tuple[str, str]]:
         """Find measures that lie on the left margin of the page.
 
-        :param staff_info: A Dictionary whose keys are the measure and staff ids in
-        MEI terms of a crop and whose values are the bounding boxes of the staves.
+        :param keys: The measure and staff ids in MEI terms of each crop.
+        :param boxes: An (N, 4) array with the bounding boxes of the staves in
+        the same order as the keys.
         :returns: List of staves on the leftmost area of the page.
         """
-        intermediate = {k: bb[0] // 10 for k, bb in staff_info.items()}
-        min_value = min(list(intermediate.values()))
+        columns = boxes[:, 0] // 10
+        leftmost = np.flatnonzero(columns == columns.min())
 
-        return [k for k, v in intermediate.items() if v == min_value]
+        return [keys[ii] for ii in leftmost.tolist()]
 
     def _find_staff_coordinates(
         self,
-        svg_file: Element,
+        svg_file: ET._Element,
     ) -> Dict[Tuple[str, int], BoundingBox]:
         """Get the placement of measure staves in the score.
 
         :returns: A dict whose keys are tuples with the measureid and staffid of a
         measure-level staff and values are coordinates in (x,y,w,h) format.
         """
-        output = {}
-        measures = svg_file.findall(".//svg:g[@class='measure']", NAMESPACES)
+        keys = []
+        line_counts = []
+        line_paths = []
+        measures = self._XP_MEASURES(svg_file)
 
         for measure in measures:
-            staves = measure.findall(".//svg:g[@class='staff']", NAMESPACES)
+            staves = self._XP_STAVES(measure)
             measure_id = str(measure.attrib["data-n"])
             for staff in staves:
                 staff_index = int(staff.attrib["data-n"])
 
-                staff_lines_svg = staff.findall("./svg:path", NAMESPACES)
-                staff_lines_mch = [
-                    RE_LINE_COMMAND.match(line.attrib["d"]) for line in staff_lines_svg
-                ]
-                assert all(
-                    map(lambda x: x is not None, staff_lines_mch)
-                ), "Invalid path in staff line definition"
-
-                staff_lines = [
-                    tuple(map(int, matches.groups())) for matches in staff_lines_mch
-                ]
-                xcoords = [y for x in staff_lines for y in x[::2]]
-                ycoords = [y for x in staff_lines for y in x[1::2]]
-                if len(staff_lines) == 1:
-                    bbox = BoundingBox(
-                        min(xcoords),
-                        min(ycoords) - 90,
-                        max(xcoords) - min(xcoords),
-                        180,
-                    )
-                else:
-                    bbox = BoundingBox(
-                        min(xcoords),
-                        min(ycoords),
-                        max(xcoords) - min(xcoords),
-                        max(max(ycoords) - min(ycoords), 72),
-                    )
-
-                output[(measure_id, staff_index)] = bbox
+                staff_lines_svg = self._XP_PATHS(staff)
+                if not staff_lines_svg:
+                    raise ValueError("Staff without any staff lines")
+                keys.append((measure_id, staff_index))
+                line_counts.append(len(staff_lines_svg))
+                line_paths += [line.attrib["d"] for line in staff_lines_svg]
+
+        if not keys:
+            return {}
+
+        # One anchored match per line, so every path must be a valid line command.
+        staff_lines_mch = RE_LINE_COMMAND.findall("\n".join(line_paths))
+        assert len(staff_lines_mch) == len(
+            line_paths
+        ), "Invalid path in staff line definition"
+
+        staff_lines = np.array(staff_lines_mch, dtype=np.int64)
+        starts = np.cumsum([0] + line_counts[:-1])
+        xmin = np.minimum.reduceat(staff_lines[:, 0::2].min(axis=1), starts)
+        xmax = np.maximum.reduceat(staff_lines[:, 0::2].max(axis=1), starts)
+        ymin = np.minimum.reduceat(staff_lines[:, 1::2].min(axis=1), starts)
+        ymax = np.maximum.reduceat(staff_lines[:, 1::2].max(axis=1), starts)
+
+        output = {}
+        for key, nlines, x1, x2, y1, y2 in zip(
+            keys,
+            line_counts,
+            xmin.tolist(),
+            xmax.tolist(),
+            ymin.tolist(),
+            ymax.tolist(),
+        ):
+            if nlines == 1:
+                bbox = BoundingBox(x1, y1 - 90, x2 - x1, 180)
+            else:
+                bbox = BoundingBox(x1, y1, x2 - x1, max(y2 - y1, 72))
+
+            output[key] = bbox
 
         return output
 
@@ -368,6 +442,10 @@ class MeasureGenerator:
         :returns: List of generated files in the folder.
         :raises VerovioError: If verovio fails to generate anything.
         """
+        # Pages left over from a previous run would otherwise be picked up again.
+        for page in self._list_pages(page_path, file_path.stem):
+            (page_path / page).unlink()
+
         command = self._svg_command(file_path, page_path / f"{file_path.stem}.svg")
         command_output = run(command, capture_output=True, check=False)
 
@@ -376,46 +454,73 @@ class MeasureGenerator:
                 "Verovio failed to produce an output", command_output.stderr
             )
 
-        fnames = command_output.stderr.decode("utf-8").split("\n")
-        pages = [
-            x.group(1)
-            for x in [RE_FILES.match(line) for line in fnames]
-            if x is not None
-        ]
-        return pages
+        return self._list_pages(page_path, file_path.stem)
+
+    @staticmethod
+    def _list_pages(page_path: Path, stem: str) -> List[str]:
+        """List the page-level svg's written by Verovio for a given score.
+
+        Verovio names every page as <stem>_<page number>.svg.
+
+        :param page_path: Folder in which the page-level svg's are generated.
+        :param stem: Name of the score file without its extension.
+        :returns: File names of the pages sorted by page number.
+        """
+        prefix = f"{stem}_"
+        pages = []
+        with os.scandir(page_path) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith(prefix) and name.endswith(".svg")):
+                    continue
+                number = name[len(prefix) : -len(".svg")]
+                if number.isdigit():
+                    pages.append((int(number), name))
+
+        return [name for _, name in sorted(pages)]
 
     def _get_staves(
         self,
-        xml_tree: Element,
+        xml_data: bytes,
     ) -> Dict[str, Dict[str, Any]]:
         """Assign staves to each Part Identifier.
 
-        :param input_file: Path to the MusicXML input file.
+        The MusicXML file is streamed and every measure is released as soon as it
+        has been read, so the whole tree is never held in memory.
+
+        :param xml_data: Contents of the MusicXML file.
         :returns: A dictionary whose keys are the part id's and whose values are
         other dictionaries. These latter dictionaries contain the number of staves
         of the given part under the "nstaves" key and a list of assigned indices
         under the "staves" key.
         """
-        part_list_elm = xml_tree.find("part-list")
-        if part_list_elm is None:
-            raise ValueError("The MusicXML file has no part-list available.")
-        part_list = [
-            x.attrib["id"] for ii, x in enumerate(part_list_elm.findall("score-part"))
-        ]
-
-        part_elements = xml_tree.findall("part")
-
+        has_part_list = False
+        part_list = []
         part_staves = {}
-        for part in part_elements:
-            part_id = part.attrib["id"]
-            part_attrib = [
-                int(x.text)
-                for x in part.findall("measure/attributes/staves")
-                if x is not None
-            ] or [1]
-            curr_staves = max(part_attrib)
+        part_attrib = []
+
+        for _, elm in ET.iterparse(
+            BytesIO(xml_data),
+            events=("end",),
+            tag=("part-list", "score-part", "staves", "measure", "part"),
+            huge_tree=True,
+        ):
+            tag = elm.tag
+            if tag == "staves":
+                part_attrib.append(int(elm.text))
+            elif tag == "measure":
+                elm.clear()
+            elif tag == "part":
+                part_staves[elm.attrib["id"]] = {"nstaves": max(part_attrib or [1])}
+                part_attrib = []
+                elm.clear()
+            elif tag == "score-part":
+                part_list.append(elm.attrib["id"])
+            else:
+                has_part_list = True
 
-            part_staves[part_id] = {"nstaves": curr_staves}
+        if not has_part_list:
+            raise ValueError("The MusicXML file has no part-list available.")
 
         staff_index = 1
         for ii in part_list:
@@ -429,7 +534,7 @@ class MeasureGenerator:
 
     def _get_svg_page_size(
         self,
-        svg_xml: Element,
+        svg_xml: ET._Element,
     ) -> Tuple[int, int]:
         """Inspect a Verovio svg xml to find the svg canvas size.
 
@@ -437,29 +542,58 @@ class MeasureGenerator:
         question.
         :returns: A tuple with page width and height.
         """
-        scale_obj = svg_xml.find('.//svg:svg[@class="definition-scale"]', NAMESPACES)
-        if scale_obj is None:
+        scale_objs = self._XP_SCALE(svg_xml)
+        if not scale_objs:
             raise ValueError("No scale object found within output SVG")
+        scale_obj = scale_objs[0]
         view_box_elm = scale_obj.attrib["viewBox"]
         view_box = tuple(map(int, view_box_elm.split(" ")))[2:]
 
         return view_box
 
-    def _svg2img(self, input_file: Path) -> ArrayLike:
+    @staticmethod
+    def _write_png(output_file: Path, image: np.ndarray) -> None:
+        """Encode an image as PNG in memory and write it to disk.
+
+        :param output_file: Path of the PNG file to write.
+        :param image: Image to encode.
+        :raises ValueError: If OpenCV fails to encode the image.
+        """
+        success, png_buffer = cv2.imencode(".png", image)
+        if not success:
+            raise ValueError(f"Could not encode {output_file.name} as PNG")
+        output_file.write_bytes(png_buffer)
+
+    def _svg2img(self, input_file: Path) -> np.ndarray:
         """Generate a raster image from an SVG file and load it for cropping.
 
-        Caveats: It produces a file on the pages directory with the image raster
-        and loads it back. Requires Inkscape.
+        Caveats: The raster is done in memory with CairoSVG onto a white
+        background, but it is also written as a PNG file on the pages directory.
+        A hash of the SVG is stored next to the PNG, so an unchanged page is loaded
+        back from disk instead of being rastered again on later runs.
 
         :param input_file: Path to the full page to raster.
         :returns: Rastered image as an array.
         """
         output_file = input_file.parent / (input_file.stem + ".png")
-        command = ["inkscape", str(input_file), "-o", str(output_file)]
-        _ = run(command, capture_output=True, check=False)
-        png_img = cv2.imread(str(output_file), cv2.IMREAD_UNCHANGED)
-        png_img[png_img[:, :, 3] == 0] = [255, 255, 255, 255]
-        png_img = cv2.cvtColor(png_img, cv2.COLOR_BGRA2BGR)
+        hash_file = input_file.parent / (input_file.stem + ".png.blake2b")
+        svg_bytes = input_file.read_bytes()
+        digest = hashlib.blake2b(svg_bytes, digest_size=16).hexdigest()
+
+        if output_file.exists() and hash_file.exists():
+            if hash_file.read_text() == digest:
+                png_img = cv2.imread(str(output_file), cv2.IMREAD_COLOR)
+                if png_img is not None:
+                    return png_img
+
+        png_bytes = cairosvg.svg2png(
+            bytestring=svg_bytes, url=str(input_file), background_color="white"
+        )
+        output_file.write_bytes(png_bytes)
+        hash_file.write_text(digest)
+        png_img = cv2.imdecode(
+            np.frombuffer(png_bytes, dtype=np.uint8), cv2.IMREAD_COLOR
+        )
 
         return png_img
 
@@ -509,6 +643,8 @@ class MeasureGenerator:
     ) -> Callable:
         """Generate a function that scales SVG coordinates to page size.
 
+        Prefer `_scale_boxes` when converting more than a handful of boxes.
+
         Parameters
         ----------
         Tuple[int, int]
@@ -527,13 +663,9 @@ class MeasureGenerator:
         ValueError
             Raised if one of the coordinates is zero.
         """
-        if canvas_size[0] == 0 or canvas_size == 0:
-            raise ValueError(
-                "Input coordinates for either the svg canvas or the output"
-                " image are zero."
-            )
-        width_factor = page_size[0] / canvas_size[0]
-        height_factor = page_size[1] / canvas_size[1]
+        width_factor, height_factor = MeasureGenerator._scale_factors(
+            canvas_size, page_size
+        )
 
         def conversor(
             bbox: BoundingBox,
@@ -551,39 +683,59 @@ class MeasureGenerator:
         return conversor
 
     @staticmethod
-    def _probe_verovio() -> None:
-        """Check whether verovio is installed or not.
+    def _scale_boxes(
+        boxes: np.ndarray,
+        canvas_size: Tuple[int, int],
+        page_size: Tuple[int, int],
+    ) -> np.ndarray:
+        """Scale an array of SVG bounding boxes to page size.
 
-        Raises
-        ------
-        VerovioNotFoundError
-            If Verovio is not found when called. It should be installed on the system
-            and added to PATH.
-        """
-        try:
-            run(["verovio", "-h base"], capture_output=True, check=False)
-        except FileNotFoundError as exc:
-            raise exc from VerovioNotFoundError
+        Vectorised counterpart of the function produced by `_produce_conversor`.
 
-    @staticmethod
-    def _probe_inkscape() -> None:
-        """Check whether Inkscape is installed or not.
+        Parameters
+        ----------
+        np.ndarray
+            An (N, 4) array of bounding boxes in (x, y, w, h) format.
+        Tuple[int, int]
+            A width, height tuple with the size of the svg canvas.
+        Tuple[int, int]
+            A width, height tuple with the size of the output image.
+
+        Returns
+        -------
+        np.ndarray
+            An (N, 4) integer array with the boxes in output image coordinates.
 
         Raises
         ------
-        InkscapeNotFoundError
-            If Inkscape is not found when called. It should be installed on the system
-            and added to PATH.
+        ValueError
+            Raised if one of the coordinates is zero.
         """
-        try:
-            run(["inkscape", "--help"], capture_output=True, check=False)
-        except FileNotFoundError as exc:
-            raise InkscapeNotFoundError(
-                "Inkscape is not installed on the system."
-            ) from exc
+        width_factor, height_factor = MeasureGenerator._scale_factors(
+            canvas_size, page_size
+        )
+        scale = np.array(
+            [width_factor, height_factor, width_factor, height_factor],
+            dtype=np.float64,
+        )
+        return (boxes * scale).astype(np.int64)
+
+    @staticmethod
+    def _scale_factors(
+        canvas_size: Tuple[int, int],
+        page_size: Tuple[int, int],
+    ) -> Tuple[float, float]:
+        """Compute the width and height factors from svg canvas to page size."""
+        if 0 in canvas_size or 0 in page_size:
+            raise ValueError(
+                "Input coordinates for either the svg canvas or the output"
+                " image are zero."
+            )
+        return page_size[0] / canvas_size[0], page_size[1] / canvas_size[1]
 
 
 def main(args: Namespace) -> None:
+    logging.basicConfig(level=logging.INFO)
     generator = MeasureGenerator(args.source, args.target, args.hfactor)
     generator.generate()
 